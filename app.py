@@ -1,13 +1,53 @@
 from flask import Flask, request, jsonify
-import hmac, hashlib, requests, time, json, base64, os
-from datetime import datetime
+import binascii
+import hmac, hashlib, requests, time, json, os
+import logging
+import logging.handlers
+import queue
+import ssl
 import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+
+    def json_dumps(obj):
+        """Serialize to compact JSON bytes (C fast path)"""
+        return orjson.dumps(obj)
+
+    json_loads = orjson.loads
+    _HAS_ORJSON = True
+except ImportError:  # orjson missing — fall back to stdlib
+    def json_dumps(obj):
+        """Serialize to compact JSON bytes"""
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    json_loads = json.loads
+    _HAS_ORJSON = False
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # ===================================================
 # ✅ FLASK APP
 # ===================================================
 app = Flask(__name__)
 
+if _HAS_ORJSON:
+    from flask.json.provider import JSONProvider
+
+    class OrjsonProvider(JSONProvider):
+        """Route every jsonify through orjson's C encoder"""
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = OrjsonProvider(app)
+
 # ===================================================
 # ✅ STATE FILE CONFIG
 # ===================================================
@@ -20,6 +60,8 @@ STATE_FILE_PATH = (
 )
 if not os.path.exists(os.path.dirname(STATE_FILE_PATH)):
     os.makedirs(os.path.dirname(STATE_FILE_PATH), exist_ok=True)
+# Closed trades append here one line at a time; the state file stays scalar-sized
+TRADES_LOG_PATH = os.path.join(os.path.dirname(STATE_FILE_PATH), "trades.jsonl")
 print(f"💾 Using state file at: {STATE_FILE_PATH}")
 
 # ===================================================
@@ -30,6 +72,7 @@ BITGET_API_KEY = os.environ.get("BITGET_API_KEY", "")
 BITGET_SECRET_KEY = os.environ.get("BITGET_SECRET_KEY", "")
 BITGET_PASSPHRASE = os.environ.get("BITGET_PASSPHRASE", "")
 WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "Grrtrades")
+_WEBHOOK_SECRET_BYTES = WEBHOOK_SECRET.encode("utf-8")
 SYMBOL = os.environ.get("SYMBOL", "ASTERUSDT_UMCBL")
 PRODUCT_TYPE = "umcbl"  # USDT-M futures
 MARGIN_COIN = "USDT"
@@ -45,70 +88,169 @@ DEBOUNCE_SEC = float(os.environ.get("DEBOUNCE_SEC", 2.0))
 PRICE_CHECK_INTERVAL = 1.0
 MAX_PRICE_FAILURES = 10
 STATS_LOG_INTERVAL = 300  # Log stats every 5 minutes
+TRADE_HISTORY_MAX = int(os.environ.get("TRADE_HISTORY_MAX", 1000))
+RENDER_URL = os.environ.get("RENDER_URL", "")  # e.g. https://mexc-bot.onrender.com
+KEEP_ALIVE_INTERVAL = 240  # ping ourselves before Render's free-tier idle timeout
+
+# Folded once: balance * this = notional position size in USDT
+POSITION_SIZE_MULT = (RISK_PERCENTAGE / 100) * LEVERAGE
+
+# Constant ratios folded at import — entry_price * mult = TP/SL price
+_TP_LONG_MULT = 1 + TAKE_PROFIT_PCT / 100
+_TP_SHORT_MULT = 1 - TAKE_PROFIT_PCT / 100
+_SL_LONG_MULT = 1 - STOP_LOSS_PCT / 100
+_SL_SHORT_MULT = 1 + STOP_LOSS_PCT / 100
+_RESET_MULT = 1 + PROFIT_RESET_THRESHOLD
+
+# LIVE_MODE=false runs the virtual balance without touching the exchange
+LIVE_MODE = os.environ.get("LIVE_MODE", "true").lower() in ("1", "true", "yes")
+SIM_PRICE = float(os.environ.get("SIM_PRICE", 0.0))  # fixed sim-mode price (0 = fetch real)
+
+# ===================================================
+# ✅ HTTP SESSION (keep-alive connection pooling)
+# ===================================================
+# One pooled session for all Bitget calls so each webhook reuses the same
+# TCP+TLS connection instead of paying a fresh handshake per request.
+SESSION = requests.Session()
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=[502, 503, 504]),
+    ),
+)
+SESSION.headers.update({"Content-Type": "application/json", "locale": "en-US"})
+
+# Shared pool for firing independent Bitget calls concurrently (each call
+# is pure I/O, so overlapping them saves one round-trip per extra call).
+EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="bitget")
 
 # ===================================================
 # ✅ LOGGING
 # ===================================================
+# Request threads only enqueue records; a QueueListener thread does the
+# formatting and stdout write so a trade burst never serializes on I/O.
+_log_queue = queue.SimpleQueue()
+_log_stream = logging.StreamHandler()
+_log_stream.setFormatter(logging.Formatter(
+    "[%(asctime)s] [%(levelname)s] %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_stream)
+_log_listener.start()
+
+logger = logging.getLogger("bot")
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+logger.propagate = False
+
+_LOG_LEVELS = {"INFO": logging.INFO, "WARN": logging.WARNING, "ERROR": logging.ERROR}
+
 def log(msg, level="INFO"):
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [{level}] {msg}")
+    logger.log(_LOG_LEVELS.get(level, logging.INFO), msg)
 
 # ===================================================
 # ✅ BITGET API SIGNATURE
 # ===================================================
-def generate_signature(timestamp, method, request_path, body=""):
-    """Generate Bitget API signature"""
-    message = str(timestamp) + method.upper() + request_path + (body if body else "")
-    mac = hmac.new(
-        bytes(BITGET_SECRET_KEY, encoding="utf8"),
-        bytes(message, encoding="utf-8"),
-        digestmod=hashlib.sha256,
-    )
-    return base64.b64encode(mac.digest()).decode()
-
-def get_headers(method, request_path, body=""):
+# Signatures lean on hashlib.sha256, which only hits the CPU's SHA
+# extensions when Python links a modern OpenSSL — surface it at startup
+# so a slow scalar build is visible in the deploy logs.
+if ssl.OPENSSL_VERSION_INFO < (1, 1, 1):
+    log(f"⚠️  Old OpenSSL ({ssl.OPENSSL_VERSION}) — SHA-256 may lack HW acceleration", "WARN")
+
+# The secret is fixed for the process lifetime, so derive the HMAC key
+# schedule (ipad/opad) once and clone it per signature instead of paying
+# two extra SHA-256 compressions in hmac.new on every API call.
+_HMAC_TEMPLATE = hmac.new(BITGET_SECRET_KEY.encode("utf-8"), digestmod=hashlib.sha256)
+_b2a_base64 = binascii.b2a_base64  # pre-bound for the per-signature call
+
+def generate_signature(timestamp, method, request_path, body=b""):
+    """Generate Bitget API signature over the exact bytes sent on the wire"""
+    mac = _HMAC_TEMPLATE.copy()
+    mac.update(f"{timestamp}{method.upper()}{request_path}".encode("utf-8"))
+    if body:
+        mac.update(body)
+    # b2a_base64 is what b64encode wraps; calling it directly skips the
+    # wrapper and the trailing-newline slice.
+    return _b2a_base64(mac.digest(), newline=False).decode("ascii")
+
+# Fixed auth headers; only ACCESS-SIGN / ACCESS-TIMESTAMP vary per call.
+_BASE_HEADERS = {
+    "ACCESS-KEY": BITGET_API_KEY,
+    "ACCESS-PASSPHRASE": BITGET_PASSPHRASE,
+}
+
+_time_ns = time.time_ns  # pre-bound: skips the module attribute lookup per call
+
+def get_headers(method, request_path, body=b""):
     """Generate request headers with signature"""
-    timestamp = str(int(time.time() * 1000))
-    sign = generate_signature(timestamp, method, request_path, body)
-    return {
-        "ACCESS-KEY": BITGET_API_KEY,
-        "ACCESS-SIGN": sign,
-        "ACCESS-TIMESTAMP": timestamp,
-        "ACCESS-PASSPHRASE": BITGET_PASSPHRASE,
-        "Content-Type": "application/json",
-        "locale": "en-US",
-    }
+    timestamp = str(_time_ns() // 1_000_000)
+    headers = _BASE_HEADERS.copy()
+    headers["ACCESS-SIGN"] = generate_signature(timestamp, method, request_path, body)
+    headers["ACCESS-TIMESTAMP"] = timestamp
+    return headers
 
 # ===================================================
 # ✅ BITGET API FUNCTIONS
 # ===================================================
-def get_current_price(symbol):
-    """Fetch current market price"""
+PRICE_CACHE_TTL = float(os.environ.get("PRICE_TTL_SEC", 0.5))  # rapid-fire signals reuse the last ticker hit
+_price_cache = {}
+_price_cache_lock = threading.Lock()
+
+# Hot endpoints for the configured symbol, built once at import so the
+# per-call path skips the f-string interpolation and concat.
+_TICKER_URL = BASE_URL + "/api/mix/v1/market/ticker?symbol=" + SYMBOL
+_SINGLEPOS_PATH = f"/api/mix/v1/position/singlePosition?symbol={SYMBOL}&marginCoin={MARGIN_COIN}"
+
+def get_current_price_fresh(symbol):
+    """Fetch current market price straight from the ticker"""
+    if not LIVE_MODE and SIM_PRICE:
+        return SIM_PRICE
     try:
-        response = requests.get(
-            BASE_URL + f"/api/mix/v1/market/ticker?symbol={symbol}", 
+        url = (
+            _TICKER_URL
+            if symbol == SYMBOL
+            else BASE_URL + f"/api/mix/v1/market/ticker?symbol={symbol}"
+        )
+        response = SESSION.get(
+            url,
             timeout=5
         )
-        data = response.json()
+        data = json_loads(response.content)
         if data.get("code") == "00000":
-            return float(data["data"]["last"])
+            price = float(data["data"]["last"])
+            with _price_cache_lock:
+                _price_cache[symbol] = (time.monotonic(), price)
+            return price
         log(f"❌ Price fetch error: {data}", "ERROR")
         return None
     except Exception as e:
         log(f"❌ Price fetch failed: {e}", "ERROR")
         return None
 
+def get_current_price(symbol):
+    """Current market price, served from a short TTL cache when hot"""
+    with _price_cache_lock:
+        entry = _price_cache.get(symbol)
+    if entry and time.monotonic() - entry[0] < PRICE_CACHE_TTL:
+        return entry[1]
+    return get_current_price_fresh(symbol)
+
 def set_leverage(symbol, leverage, margin_coin="USDT"):
     """Set leverage for symbol"""
+    if not LIVE_MODE:
+        return True
     try:
         request_path = "/api/mix/v1/account/setLeverage"
-        body = json.dumps({
+        body = json_dumps({
             "symbol": symbol,
             "marginCoin": margin_coin,
             "leverage": str(leverage)
         })
         headers = get_headers("POST", request_path, body)
-        response = requests.post(BASE_URL + request_path, headers=headers, data=body, timeout=10)
-        data = response.json()
+        response = SESSION.post(BASE_URL + request_path, headers=headers, data=body, timeout=10)
+        data = json_loads(response.content)
         if data.get("code") == "00000":
             log(f"✅ Leverage set to {leverage}x")
             return True
@@ -124,9 +266,13 @@ def place_market_order(symbol, side, size, margin_coin="USDT"):
     side: 'open_long', 'open_short', 'close_long', 'close_short'
     size: USDT value of position
     """
+    if not LIVE_MODE:
+        order_id = f"sim-{_time_ns()}"
+        log(f"🧪 SIM order: {side} | Size: ${size:.2f} | Order ID: {order_id}")
+        return order_id
     try:
         request_path = "/api/mix/v1/order/placeOrder"
-        body = json.dumps({
+        body = json_dumps({
             "symbol": symbol,
             "marginCoin": margin_coin,
             "size": str(size),
@@ -135,8 +281,8 @@ def place_market_order(symbol, side, size, margin_coin="USDT"):
             "timeInForceValue": "normal"
         })
         headers = get_headers("POST", request_path, body)
-        response = requests.post(BASE_URL + request_path, headers=headers, data=body, timeout=10)
-        data = response.json()
+        response = SESSION.post(BASE_URL + request_path, headers=headers, data=body, timeout=10)
+        data = json_loads(response.content)
         
         if data.get("code") == "00000":
             order_id = data["data"]["orderId"]
@@ -149,39 +295,49 @@ def place_market_order(symbol, side, size, margin_coin="USDT"):
         log(f"❌ Place order exception: {e}", "ERROR")
         return None
 
-def get_position(symbol, margin_coin="USDT"):
-    """Get current position for symbol"""
+def get_open_positions(symbol, margin_coin="USDT"):
+    """Get all open positions for symbol (both hold sides)"""
     try:
-        request_path = f"/api/mix/v1/position/singlePosition?symbol={symbol}&marginCoin={margin_coin}"
+        request_path = (
+            _SINGLEPOS_PATH
+            if symbol == SYMBOL and margin_coin == MARGIN_COIN
+            else f"/api/mix/v1/position/singlePosition?symbol={symbol}&marginCoin={margin_coin}"
+        )
         headers = get_headers("GET", request_path)
-        response = requests.get(BASE_URL + request_path, headers=headers, timeout=10)
-        data = response.json()
-        
+        response = SESSION.get(BASE_URL + request_path, headers=headers, timeout=10)
+        data = json_loads(response.content)
+
         if data.get("code") == "00000" and data.get("data"):
-            positions = data["data"]
-            for pos in positions:
-                if float(pos.get("total", 0)) > 0:
-                    return pos
-        return None
+            return [pos for pos in data["data"] if float(pos.get("total", 0)) > 0]
+        return []
     except Exception as e:
         log(f"❌ Get position failed: {e}", "ERROR")
-        return None
+        return []
+
+def get_position(symbol, margin_coin="USDT"):
+    """Get first open position for symbol, or None"""
+    positions = get_open_positions(symbol, margin_coin)
+    return positions[0] if positions else None
 
 def close_all_positions(symbol, margin_coin="USDT"):
-    """Close any open positions"""
+    """Close any open positions (both sides in parallel)"""
+    if not LIVE_MODE:
+        return True
     try:
-        pos = get_position(symbol, margin_coin)
-        if not pos:
+        positions = get_open_positions(symbol, margin_coin)
+        if not positions:
             return True
-        
-        hold_side = pos.get("holdSide", "")
-        total = float(pos.get("total", 0))
-        
-        if total > 0:
+
+        # Close orders are independent per hold side, so fire them
+        # concurrently instead of paying one round-trip each.
+        futures = []
+        for pos in positions:
+            hold_side = pos.get("holdSide", "")
+            total = float(pos.get("total", 0))
             side = "close_long" if hold_side == "long" else "close_short"
             log(f"🔄 Closing existing {hold_side} position: {total}")
-            return place_market_order(symbol, side, total, margin_coin) is not None
-        return True
+            futures.append(EXECUTOR.submit(place_market_order, symbol, side, total, margin_coin))
+        return all(f.result() is not None for f in futures)
     except Exception as e:
         log(f"❌ Close positions failed: {e}", "ERROR")
         return False
@@ -190,6 +346,16 @@ def close_all_positions(symbol, margin_coin="USDT"):
 # ✅ VIRTUAL BALANCE CLASS
 # ===================================================
 class VirtualBalance:
+    __slots__ = (
+        "initial_balance", "starting_balance", "current_balance",
+        "total_trades", "winning_trades", "losing_trades", "total_pnl",
+        "current_position", "trade_history", "monitor_thread",
+        "stop_monitoring", "position_lock", "max_drawdown", "peak_balance",
+        "consecutive_losses", "trading_paused", "reset_count",
+        "phase_1_resets", "phase_2_resets", "total_withdrawn",
+        "total_profit_generated", "_tp", "_sl", "_dir",
+    )
+
     def __init__(self, initial_balance):
         self.initial_balance = initial_balance
         self.starting_balance = initial_balance
@@ -199,10 +365,13 @@ class VirtualBalance:
         self.losing_trades = 0
         self.total_pnl = 0.0
         self.current_position = None
-        self.trade_history = []
+        # Bounded so a long-running bot can't balloon RAM; old trades drop in O(1)
+        self.trade_history = deque(maxlen=TRADE_HISTORY_MAX)
         self.monitor_thread = None
         self.stop_monitoring = threading.Event()
-        self.position_lock = threading.Lock()
+        # RLock: open_position closes an existing position inline on flip,
+        # re-entering the lock from the same thread.
+        self.position_lock = threading.RLock()
         self.max_drawdown = 0.0
         self.peak_balance = initial_balance
         self.consecutive_losses = 0
@@ -212,12 +381,26 @@ class VirtualBalance:
         self.phase_2_resets = 0
         self.total_withdrawn = 0.0
         self.total_profit_generated = 0.0
+        # Hot-path mirror of current_position for the monitor tick
+        self._tp = 0.0
+        self._sl = 0.0
+        self._dir = 1.0
+
+    def _sync_position_cache(self):
+        """Mirror TP/SL/side out of the position dict into plain floats so
+        the per-second monitor compare skips the dict probes"""
+        if self.current_position:
+            self._tp = float(self.current_position["tp_price"])
+            self._sl = float(self.current_position["sl_price"])
+            # +1 for long, -1 for short: lets the monitor check both sides
+            # with one multiply instead of branching on the side
+            self._dir = 1.0 if self.current_position["side"] == "long" else -1.0
 
     def get_current_phase(self):
         return "growth" if self.starting_balance < PHASE_1_THRESHOLD else "extraction"
 
     def check_auto_reset(self):
-        if self.current_balance >= self.starting_balance * (1 + PROFIT_RESET_THRESHOLD):
+        if self.current_balance >= self.starting_balance * _RESET_MULT:
             profit = self.current_balance - self.starting_balance
             phase = self.get_current_phase()
             reinvest_pct = 1.0 if phase == "growth" else 0.05
@@ -249,29 +432,33 @@ class VirtualBalance:
         position_size_usdt: USDT value of position
         """
         with self.position_lock:
+            bitget_side = "open_long" if side == "long" else "open_short"
             if self.current_position:
+                # Flip: fire the new-side open while close_position's close
+                # order is in flight — the sides are independent on Bitget's
+                # hedge-mode endpoints, so the flip costs one round-trip
+                # instead of two
                 log("⚠️  Position already open, closing first", "WARN")
+                open_future = EXECUTOR.submit(
+                    place_market_order, SYMBOL, bitget_side,
+                    position_size_usdt, MARGIN_COIN
+                )
                 self.close_position(entry_price, "flip")
-            
-            # Place market order on Bitget
-            bitget_side = "open_long" if side == "long" else "open_short"
-            order_id = place_market_order(SYMBOL, bitget_side, position_size_usdt, MARGIN_COIN)
+                order_id = open_future.result()
+            else:
+                order_id = place_market_order(SYMBOL, bitget_side, position_size_usdt, MARGIN_COIN)
             
             if not order_id:
                 log("❌ Failed to open position on exchange", "ERROR")
                 return False
             
             # Calculate TP/SL prices
-            tp_price = (
-                entry_price * (1 + TAKE_PROFIT_PCT / 100)
-                if side == "long"
-                else entry_price * (1 - TAKE_PROFIT_PCT / 100)
-            )
-            sl_price = (
-                entry_price * (1 - STOP_LOSS_PCT / 100)
-                if side == "long"
-                else entry_price * (1 + STOP_LOSS_PCT / 100)
-            )
+            if side == "long":
+                tp_price = entry_price * _TP_LONG_MULT
+                sl_price = entry_price * _SL_LONG_MULT
+            else:
+                tp_price = entry_price * _TP_SHORT_MULT
+                sl_price = entry_price * _SL_SHORT_MULT
             
             # Calculate quantity in coins
             qty = position_size_usdt / entry_price
@@ -283,13 +470,14 @@ class VirtualBalance:
                 "size_usdt": position_size_usdt,
                 "tp_price": tp_price,
                 "sl_price": sl_price,
-                "open_time": datetime.now().isoformat(),
+                "open_time": time.strftime("%Y-%m-%dT%H:%M:%S"),
                 "order_id": order_id
             }
             
+            self._sync_position_cache()
             self._start_monitoring()
             save_state()
-            
+
             log(f"📈 OPENED {side.upper()} position")
             log(f"   Entry: ${entry_price:.4f} | Size: ${position_size_usdt:.2f} ({qty:.4f} coins)")
             log(f"   TP: ${tp_price:.4f} (+{TAKE_PROFIT_PCT}%) | SL: ${sl_price:.4f} (-{STOP_LOSS_PCT}%)")
@@ -309,36 +497,49 @@ class VirtualBalance:
     def monitor_position(self):
         """Monitor position and close when TP/SL is hit"""
         consecutive_failures = 0
-        while not self.stop_monitoring.is_set():
-            with self.position_lock:
-                if not self.current_position:
+        while True:
+            # The stop event can be set by a close and cleared again by a
+            # flip's _start_monitoring before this thread wakes, so the
+            # position itself — not the event flag — decides when to exit
+            pos = self.current_position
+            if pos is None:
+                break
+
+            # Ticker round-trip happens outside the lock so a webhook
+            # close/flip is never stuck behind slow network I/O
+            price = get_current_price(SYMBOL)
+            if not price:
+                consecutive_failures += 1
+                if consecutive_failures >= MAX_PRICE_FAILURES:
+                    log("❌ Too many price fetch failures, stopping monitor", "ERROR")
                     break
-                
-                price = get_current_price(SYMBOL)
-                if not price:
-                    consecutive_failures += 1
-                    if consecutive_failures >= MAX_PRICE_FAILURES:
-                        log("❌ Too many price fetch failures, stopping monitor", "ERROR")
+                self.stop_monitoring.wait(PRICE_CHECK_INTERVAL)
+                continue
+
+            consecutive_failures = 0
+
+            # Check TP/SL (cached floats, sign-folded: d is +1 long / -1 short,
+            # so one compare covers both sides without branching)
+            d = self._dir
+            hit = None
+            if (price - self._tp) * d >= 0:
+                hit = "TP"
+            elif (self._sl - price) * d >= 0:
+                hit = "SL"
+
+            if hit:
+                with self.position_lock:
+                    # A webhook may have closed or flipped the position while
+                    # we were fetching; only act on the one we priced
+                    if self.current_position is pos:
+                        self.close_position(price, hit)
                         break
-                    time.sleep(PRICE_CHECK_INTERVAL)
-                    continue
-                
-                consecutive_failures = 0
-                side = self.current_position["side"]
-                
-                # Check TP
-                if (side == "long" and price >= self.current_position["tp_price"]) or \
-                   (side == "short" and price <= self.current_position["tp_price"]):
-                    self.close_position(price, "TP")
-                    break
-                
-                # Check SL
-                if (side == "long" and price <= self.current_position["sl_price"]) or \
-                   (side == "short" and price >= self.current_position["sl_price"]):
-                    self.close_position(price, "SL")
-                    break
-            
-            time.sleep(PRICE_CHECK_INTERVAL)
+                continue
+
+            # Interruptible sleep: a close sets the event so the thread
+            # wakes immediately instead of finishing the poll interval,
+            # then the loop-top position check decides whether to exit
+            self.stop_monitoring.wait(PRICE_CHECK_INTERVAL)
 
     def close_position(self, exit_price, reason="manual"):
         """Close position on Bitget exchange and update virtual balance"""
@@ -387,6 +588,18 @@ class VirtualBalance:
             if drawdown > self.max_drawdown:
                 self.max_drawdown = drawdown
             
+            trade_record = {
+                "side": side,
+                "entry_price": entry_price,
+                "exit_price": exit_price,
+                "size_usdt": size_usdt,
+                "pnl": pnl,
+                "reason": reason,
+                "close_time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            self.trade_history.append(trade_record)
+            append_trade(trade_record)
+
             pnl_pct = (pnl / size_usdt) * 100
             emoji = "✅" if pnl > 0 else "❌"
             
@@ -413,7 +626,7 @@ class VirtualBalance:
         phase = self.get_current_phase()
         
         log("=" * 70)
-        log(f"📊 TRADING STATISTICS - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        log(f"📊 TRADING STATISTICS - {time.strftime('%Y-%m-%d %H:%M:%S')}")
         log("=" * 70)
         log(f"💰 Virtual Balance: ${self.current_balance:.2f} (Start: ${self.starting_balance:.2f})")
         log(f"📈 Total PnL: ${self.total_pnl:.2f} | ROI: {roi:+.2f}%")
@@ -450,32 +663,70 @@ class VirtualBalance:
 # ===================================================
 # ✅ STATE MANAGEMENT
 # ===================================================
+SAVE_COALESCE_SEC = 0.2  # burst of mutations -> one disk write
+
+_save_pending = threading.Event()
+
+def _snapshot_state():
+    return {
+        'initial_balance': virtual_balance.initial_balance,
+        'starting_balance': virtual_balance.starting_balance,
+        'current_balance': virtual_balance.current_balance,
+        'total_trades': virtual_balance.total_trades,
+        'winning_trades': virtual_balance.winning_trades,
+        'losing_trades': virtual_balance.losing_trades,
+        'total_pnl': virtual_balance.total_pnl,
+        'current_position': virtual_balance.current_position,
+        'max_drawdown': virtual_balance.max_drawdown,
+        'peak_balance': virtual_balance.peak_balance,
+        'consecutive_losses': virtual_balance.consecutive_losses,
+        'trading_paused': virtual_balance.trading_paused,
+        'reset_count': virtual_balance.reset_count,
+        'phase_1_resets': virtual_balance.phase_1_resets,
+        'phase_2_resets': virtual_balance.phase_2_resets,
+        'total_withdrawn': virtual_balance.total_withdrawn,
+        'total_profit_generated': virtual_balance.total_profit_generated,
+    }
+
+def state_writer_thread():
+    """Background writer: coalesces bursts of save_state() calls into one
+    atomic tmp-file + os.replace so the webhook never blocks on disk"""
+    while True:
+        _save_pending.wait()
+        time.sleep(SAVE_COALESCE_SEC)
+        _save_pending.clear()
+        try:
+            tmp_path = STATE_FILE_PATH + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(json_dumps(_snapshot_state()))
+                f.flush()
+                os.fsync(f.fileno())  # durable before the rename publishes it
+            os.replace(tmp_path, STATE_FILE_PATH)
+        except Exception as e:
+            log(f"❌ Failed to save state: {e}", "ERROR")
+
 def save_state():
+    _save_pending.set()
+
+def append_trade(trade_record):
+    """Append one closed trade to the trade log — O(1) regardless of history size"""
     try:
-        state = {
-            'initial_balance': virtual_balance.initial_balance,
-            'starting_balance': virtual_balance.starting_balance,
-            'current_balance': virtual_balance.current_balance,
-            'total_trades': virtual_balance.total_trades,
-            'winning_trades': virtual_balance.winning_trades,
-            'losing_trades': virtual_balance.losing_trades,
-            'total_pnl': virtual_balance.total_pnl,
-            'current_position': virtual_balance.current_position,
-            'trade_history': virtual_balance.trade_history,
-            'max_drawdown': virtual_balance.max_drawdown,
-            'peak_balance': virtual_balance.peak_balance,
-            'consecutive_losses': virtual_balance.consecutive_losses,
-            'trading_paused': virtual_balance.trading_paused,
-            'reset_count': virtual_balance.reset_count,
-            'phase_1_resets': virtual_balance.phase_1_resets,
-            'phase_2_resets': virtual_balance.phase_2_resets,
-            'total_withdrawn': virtual_balance.total_withdrawn,
-            'total_profit_generated': virtual_balance.total_profit_generated,
-        }
-        with open(STATE_FILE_PATH, "w") as f:
-            json.dump(state, f, indent=2)
+        with open(TRADES_LOG_PATH, "ab") as f:
+            f.write(json_dumps(trade_record) + b"\n")
     except Exception as e:
-        log(f"❌ Failed to save state: {e}", "ERROR")
+        log(f"❌ Failed to append trade log: {e}", "ERROR")
+
+def load_trade_history():
+    """Rebuild the bounded in-memory history from the trade log's tail"""
+    try:
+        with open(TRADES_LOG_PATH, "rb") as f:
+            tail = deque(f, maxlen=TRADE_HISTORY_MAX)
+        return deque((json_loads(line) for line in tail), maxlen=TRADE_HISTORY_MAX)
+    except FileNotFoundError:
+        return deque(maxlen=TRADE_HISTORY_MAX)
+    except Exception as e:
+        log(f"⚠️  Failed to load trade log: {e}", "WARN")
+        return deque(maxlen=TRADE_HISTORY_MAX)
 
 def load_state():
     try:
@@ -483,14 +734,28 @@ def load_state():
             state = json.load(f)
         
         for key, value in state.items():
-            if hasattr(virtual_balance, key):
+            if key == 'trade_history':  # legacy combined state files
+                virtual_balance.trade_history = deque(value, maxlen=TRADE_HISTORY_MAX)
+                # Migrate the embedded records into the trade log: the next
+                # snapshot drops the trade_history key, so without this the
+                # first post-migration save would silently discard them.
+                # Skip if a log already exists — a restart before that save
+                # would otherwise append duplicates.
+                if not os.path.exists(TRADES_LOG_PATH):
+                    for record in value:
+                        append_trade(record)
+                    log(f"♻️  Migrated {len(value)} legacy trades to {TRADES_LOG_PATH}")
+            elif hasattr(virtual_balance, key):
                 setattr(virtual_balance, key, value)
+        if 'trade_history' not in state:
+            virtual_balance.trade_history = load_trade_history()
         
         log(f"✅ State loaded: Balance ${virtual_balance.current_balance:.2f}, {virtual_balance.total_trades} trades")
         
         # Resume monitoring if there's an active position
         if virtual_balance.current_position:
             log(f"♻️  Resuming monitoring of {virtual_balance.current_position['side'].upper()} position")
+            virtual_balance._sync_position_cache()
             virtual_balance._start_monitoring()
             
     except FileNotFoundError:
@@ -510,28 +775,56 @@ def stats_logger_thread():
         except Exception as e:
             log(f"❌ Stats logging error: {e}", "ERROR")
 
+# ===================================================
+# ✅ KEEP-ALIVE PINGER
+# ===================================================
+def keep_alive_thread():
+    """Ping our own /health through the shared session so the free-tier
+    dyno never idles out and the connection pool stays warm"""
+    while True:
+        time.sleep(KEEP_ALIVE_INTERVAL)
+        try:
+            SESSION.get(RENDER_URL + "/health", timeout=5)
+        except Exception:
+            pass
+
 # ===================================================
 # ✅ INIT VIRTUAL BALANCE & SETUP
 # ===================================================
 virtual_balance = VirtualBalance(INITIAL_BALANCE)
 load_state()
 
-# Set leverage on startup
+# Start the debounced state writer
+state_thread = threading.Thread(target=state_writer_thread, daemon=True)
+state_thread.start()
+
+# Set leverage on startup — fire it on the executor so a slow Bitget
+# response doesn't delay the server accepting webhooks on cold start.
 log(f"⚙️  Setting leverage to {LEVERAGE}x...")
-set_leverage(SYMBOL, LEVERAGE, MARGIN_COIN)
+EXECUTOR.submit(set_leverage, SYMBOL, LEVERAGE, MARGIN_COIN)
 
 # Start stats logger thread
 stats_thread = threading.Thread(target=stats_logger_thread, daemon=True)
 stats_thread.start()
 log(f"🚀 Stats logger started - logging every {STATS_LOG_INTERVAL}s")
 
+# Start keep-alive pinger if we know our own URL
+if RENDER_URL:
+    threading.Thread(target=keep_alive_thread, daemon=True).start()
+    log(f"🔄 Keep-alive pinger started - every {KEEP_ALIVE_INTERVAL}s")
+
 # Log initial stats
 virtual_balance.log_stats()
 
 # ===================================================
 # ✅ WEBHOOK ENDPOINT
 # ===================================================
-last_signal_time = 0
+last_signal_time = 0.0  # time.monotonic() of the last accepted signal
+_signal_lock = threading.Lock()  # serializes the debounce check across workers
+
+# Map TradingView actions onto position sides in one lookup; CLOSE is
+# handled separately since it carries no side.
+_ACTION_SIDES = {'BUY': 'long', 'LONG': 'long', 'SELL': 'short', 'SHORT': 'short'}
 
 @app.route('/webhook', methods=['POST', 'GET'])
 def webhook():
@@ -544,40 +837,65 @@ def webhook():
             'can_trade': virtual_balance.should_trade(),
             'balance': virtual_balance.current_balance,
             'position': virtual_balance.current_position,
-            'uptime': datetime.now().isoformat()
+            'uptime': time.strftime('%Y-%m-%dT%H:%M:%S')
         }), 200
 
     # --- Handle POST (TradingView signals) ---
+    # X-Webhook-Secret rejects unauthorized posts before we even parse the
+    # body; the body 'secret' field stays as the TradingView-compatible path.
+    header_secret = request.headers.get('X-Webhook-Secret')
+    if header_secret is not None and not hmac.compare_digest(
+        header_secret.encode("utf-8"), _WEBHOOK_SECRET_BYTES
+    ):
+        log("⚠️  Unauthorized webhook attempt", "WARN")
+        return jsonify({'error': 'Unauthorized'}), 401
+
     try:
-        data = json.loads(request.get_data(as_text=True))
+        data = json_loads(request.get_data())
     except Exception:
         return jsonify({'error': 'Invalid JSON'}), 400
+    # Cheap shape check so spam/garbage bodies bail before any real work
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Invalid JSON'}), 400
 
-    # Check secret
-    if data.get('secret') != WEBHOOK_SECRET:
-        log("⚠️  Unauthorized webhook attempt", "WARN")
-        return jsonify({'error': 'Unauthorized'}), 401
+    if header_secret is None:
+        # Check body secret (constant-time compare — no timing oracle)
+        provided = data.get('secret')
+        if not isinstance(provided, str) or not hmac.compare_digest(
+            provided.encode("utf-8"), _WEBHOOK_SECRET_BYTES
+        ):
+            log("⚠️  Unauthorized webhook attempt", "WARN")
+            return jsonify({'error': 'Unauthorized'}), 401
+
+    action = data.get('action', '')
+    if not isinstance(action, str):
+        return jsonify({'error': 'Invalid action'}), 400
 
-    # Debounce signals
-    now = time.time()
-    if now - last_signal_time < DEBOUNCE_SEC:
-        log("⏱️  Signal debounced (too fast)")
-        return jsonify({'success': True, 'action': 'debounced'}), 200
-    last_signal_time = now
+    # Debounce signals (monotonic clock — immune to NTP steps)
+    action = action.upper()
+    now = time.monotonic()
+    with _signal_lock:
+        if now - last_signal_time < DEBOUNCE_SEC:
+            # TradingView retries often re-fire the same side; if we're
+            # already positioned that way, skip every API round-trip.
+            position = virtual_balance.current_position
+            if position and _ACTION_SIDES.get(action) == position['side']:
+                log("⏱️  Duplicate same-side signal ignored")
+                return jsonify({'success': True, 'action': 'duplicate'}), 200
+            log("⏱️  Signal debounced (too fast)")
+            return jsonify({'success': True, 'action': 'debounced'}), 200
+        last_signal_time = now
 
     # Check if trading is paused
     if not virtual_balance.should_trade():
         log("⛔ Signal rejected - trading paused due to emergency stop", "WARN")
         return jsonify({'success': False, 'reason': 'paused'}), 200
 
-    # Get action
-    action = data.get('action', '').upper()
-    
     # Handle CLOSE signal from TradingView
     if action == 'CLOSE':
         log("📥 TradingView CLOSE signal received")
         if virtual_balance.current_position:
-            price = get_current_price(SYMBOL)
+            price = get_current_price_fresh(SYMBOL)
             if not price:
                 log("❌ Failed to fetch price for close", "ERROR")
                 return jsonify({'error': 'Price fetch failed'}), 500
@@ -592,7 +910,8 @@ def webhook():
             log("ℹ️  CLOSE signal but no position open (already closed by bot)")
             return jsonify({'success': True, 'action': 'no_position'}), 200
     
-    if action not in ['BUY', 'LONG', 'SELL', 'SHORT']:
+    side = _ACTION_SIDES.get(action)
+    if side is None:
         log(f"❌ Invalid action received: {action}", "ERROR")
         return jsonify({'error': 'Invalid action'}), 400
 
@@ -605,11 +924,8 @@ def webhook():
         return jsonify({'error': 'Price fetch failed'}), 500
 
     # Calculate position size based on virtual balance
-    position_size_usdt = virtual_balance.current_balance * (RISK_PERCENTAGE / 100) * LEVERAGE
-    
-    # Determine side
-    side = 'long' if action in ['BUY', 'LONG'] else 'short'
-    
+    position_size_usdt = virtual_balance.current_balance * POSITION_SIZE_MULT
+
     # Open position (will close existing if any)
     success = virtual_balance.open_position(side, price, position_size_usdt)
     
@@ -631,16 +947,29 @@ def webhook():
 # ===================================================
 # ✅ HEALTH CHECK ENDPOINT
 # ===================================================
+# Keep-alive pollers hit /health far more often than state changes, so
+# cache the rendered bytes and only re-serialize when a field moves.
+_health_cache = (None, b"")
+
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({
-        "status": "ok",
-        "message": "bot running",
-        "balance": virtual_balance.current_balance,
-        "trades": virtual_balance.total_trades,
-        "active_position": virtual_balance.current_position is not None,
-        "trading_paused": virtual_balance.trading_paused
-    }), 200
+    global _health_cache
+    key = (
+        virtual_balance.current_balance,
+        virtual_balance.total_trades,
+        virtual_balance.current_position is not None,
+        virtual_balance.trading_paused,
+    )
+    if _health_cache[0] != key:
+        _health_cache = (key, json_dumps({
+            "status": "ok",
+            "message": "bot running",
+            "balance": key[0],
+            "trades": key[1],
+            "active_position": key[2],
+            "trading_paused": key[3],
+        }))
+    return app.response_class(_health_cache[1], mimetype="application/json"), 200
 
 # ===================================================
 # ✅ MAIN ENTRY POINT
@@ -0,0 +1,12 @@
+# Gunicorn config — one gthread worker so the in-process virtual balance
+# stays authoritative; threads overlap the blocking Bitget round-trips.
+import os
+
+bind = "0.0.0.0:" + os.environ.get("PORT", "5000")
+workers = 1
+worker_class = "gthread"
+threads = 8
+timeout = 30
+keepalive = 30  # hold TradingView/monitor connections open between alerts
+worker_tmp_dir = "/dev/shm"  # heartbeat file in RAM, not dyno disk
+reuse_port = True